@@ -6,17 +6,43 @@ Changes made:
 - Provide `get_ec2_client()` and an `/api/instances` endpoint to list running EC2 instances.
 - Ensure credential checks correctly detect environment/CLI credentials.
 
-This file is suitable for local development. In production run it behind a proper WSGI server.
+This file is suitable for local development. In production run it behind a proper WSGI server
+(see `wsgi.py`).
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import orjson
 import os
 import boto3
 import botocore
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
+import itertools
+import time
+from functools import lru_cache
+from threading import Lock
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from cachetools import TTLCache
 from datetime import datetime, timedelta
 
+# Naive datetimes are UTC throughout this backend; emit them with a trailing 'Z'.
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster (de)serialization of API responses."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Global credentials storage (in-memory for session)
@@ -33,6 +59,74 @@ FRONTEND_CONFIG = {
     'refreshInterval': 30000,
 }
 
+# Environment credentials are fixed for the life of the process, so check them once
+_ENV_CREDS = bool(os.environ.get('AWS_ACCESS_KEY_ID') and os.environ.get('AWS_SECRET_ACCESS_KEY'))
+
+# /api/config payload, rebuilt only when credentials change (see _rebuild_config)
+_CONFIG_CACHE = {'version': 0, 'payload': None}
+
+# Short-lived cache of CloudWatch reads so concurrent dashboard clients and
+# repeat polls within the TTL share a single round-trip per metric. Keyed by
+# account and region so switching logins never serves another account's data.
+_cw_cache = TTLCache(maxsize=128, ttl=60)
+_cw_lock = Lock()
+
+# In-flight CloudWatch fetches, so identical concurrent /api/metrics requests share one call
+_inflight = {}
+_inflight_lock = Lock()
+
+# STS GetCallerIdentity results keyed by credential fingerprint: account ids for
+# 5 minutes, auth failures (see _STS_AUTH_ERROR_CODES) for 2 minutes so refresh
+# loops don't hammer STS.
+_sts_ok_cache = TTLCache(maxsize=300, ttl=300)
+_sts_bad_cache = TTLCache(maxsize=128, ttl=120)
+_sts_lock = Lock()
+
+# Pooled HTTP session for the Nagios proxy so calls reuse TCP/TLS connections.
+_nagios_session = requests.Session()
+_nagios_session.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=50))
+_nagios_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=50))
+
+
+def _sts_cache_key(access_key, secret_key, region):
+    raw = '\0'.join([access_key or 'env', secret_key or '', region or ''])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _caller_account(key, make_sts):
+    """Return the account id for `key`, calling STS only on a cache miss."""
+    with _sts_lock:
+        account_id = _sts_ok_cache.get(key)
+    if account_id is None:
+        account_id = make_sts().get_caller_identity()['Account']
+        with _sts_lock:
+            _sts_ok_cache[key] = account_id
+    return account_id
+
+
+# STS error codes that mean the credentials themselves are bad; only these are
+# negative-cached, so throttling and other transient errors retry normally.
+_STS_AUTH_ERROR_CODES = {'InvalidClientTokenId', 'SignatureDoesNotMatch', 'AccessDenied', 'ExpiredToken'}
+
+
+def _login_failed(key, message, cache=True):
+    if cache:
+        with _sts_lock:
+            _sts_bad_cache[key] = message
+    return jsonify({'error': message}), 401
+
+
+def _client_error_code(e):
+    return e.response.get('Error', {}).get('Code', '')
+
+
+def _cached_login_failure(key):
+    with _sts_lock:
+        message = _sts_bad_cache.get(key)
+    if message is None:
+        return None
+    return jsonify({'error': message}), 401
+
 
 @app.route('/api/login', methods=['POST'])
 def aws_login():
@@ -43,17 +137,21 @@ def aws_login():
     region = data.get('region', 'us-east-1')
     if not access_key or not secret_key:
         return jsonify({'error': 'Access Key and Secret Key are required'}), 400
+    key = _sts_cache_key(access_key, secret_key, region)
+    failure = _cached_login_failure(key)
+    if failure:
+        return failure
     try:
-        sts = boto3.client('sts', aws_access_key_id=access_key, aws_secret_access_key=secret_key, region_name=region)
-        idt = sts.get_caller_identity()
+        account_id = _caller_account(key, lambda: _new_client('sts', region, access_key, secret_key))
         aws_credentials['access_key'] = access_key
         aws_credentials['secret_key'] = secret_key
-        aws_credentials['account_id'] = idt['Account']
+        aws_credentials['account_id'] = account_id
         aws_credentials['region'] = region
         aws_credentials['use_env'] = False
-        return jsonify({'success': True, 'accountId': idt['Account'], 'region': region})
+        _rebuild_config()
+        return jsonify({'success': True, 'accountId': account_id, 'region': region})
     except botocore.exceptions.ClientError as e:
-        return jsonify({'error': str(e)}), 401
+        return _login_failed(key, str(e), cache=_client_error_code(e) in _STS_AUTH_ERROR_CODES)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -65,24 +163,28 @@ def aws_login_env():
     This endpoint performs a quick STS call to validate credentials are available.
     """
     region = (request.json or {}).get('region', 'us-east-1')
+    key = _sts_cache_key(None, None, region)
+    failure = _cached_login_failure(key)
+    if failure:
+        return failure
     try:
-        sts = boto3.client('sts', region_name=region)
-        idt = sts.get_caller_identity()
+        account_id = _caller_account(key, lambda: _new_client('sts', region))
         # Do not set access/secret keys when using env; instead set the `use_env` flag.
         aws_credentials['access_key'] = None
         aws_credentials['secret_key'] = None
-        aws_credentials['account_id'] = idt['Account']
+        aws_credentials['account_id'] = account_id
         aws_credentials['region'] = region
         aws_credentials['use_env'] = True
-        return jsonify({'success': True, 'accountId': idt['Account'], 'region': region})
+        _rebuild_config()
+        return jsonify({'success': True, 'accountId': account_id, 'region': region})
     except botocore.exceptions.NoCredentialsError:
-        return jsonify({'error': 'No credentials found'}), 401
+        return _login_failed(key, 'No credentials found')
     except botocore.exceptions.ClientError as e:
         # Surface helpful messages for common auth failures
-        code = e.response.get('Error', {}).get('Code', '')
+        code = _client_error_code(e)
         if code == 'InvalidClientTokenId':
-            return jsonify({'error': 'Invalid/expired credentials in environment'}), 401
-        return jsonify({'error': str(e)}), 401
+            return _login_failed(key, 'Invalid/expired credentials in environment')
+        return _login_failed(key, str(e), cache=code in _STS_AUTH_ERROR_CODES)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -90,6 +192,13 @@ def aws_login_env():
 @app.route('/api/logout', methods=['POST'])
 def aws_logout():
     aws_credentials.update({'access_key': None, 'secret_key': None, 'account_id': None, 'region': None, 'use_env': False})
+    _make_client.cache_clear()
+    with _cw_lock:
+        _cw_cache.clear()
+    with _sts_lock:
+        _sts_ok_cache.clear()
+        _sts_bad_cache.clear()
+    _rebuild_config()
     return jsonify({'success': True})
 
 
@@ -106,62 +215,188 @@ def aws_creds_present():
     if aws_credentials.get('access_key') and aws_credentials.get('secret_key'):
         return True
     # lastly, check environment variables
-    return bool(os.environ.get('AWS_ACCESS_KEY_ID') and os.environ.get('AWS_SECRET_ACCESS_KEY'))
+    return _ENV_CREDS
 
 
-def get_cloudwatch_client():
+def _new_client(service, region, access_key=None, secret_key=None):
+    """Build a boto3 client from its own Session.
+
+    boto3's shared default session is not thread-safe, and the app serves requests
+    from several threads, so clients are never created through `boto3.client`.
+    """
+    session = boto3.session.Session()
+    if access_key and secret_key:
+        return session.client(service, aws_access_key_id=access_key, aws_secret_access_key=secret_key, region_name=region)
+    return session.client(service, region_name=region)
+
+
+@lru_cache(maxsize=32)
+def _make_client(service, region, access_key=None, secret_key=None):
+    """Build a boto3 client once per (service, region, credentials) and reuse it.
+
+    Client construction loads service models and resolves endpoints, and a reused
+    client keeps its HTTP connection pool alive across requests.
+    """
+    return _new_client(service, region, access_key, secret_key)
+
+
+def _get_client(service):
     if aws_credentials.get('use_env'):
-        return boto3.client('cloudwatch', region_name=aws_credentials.get('region') or 'us-east-1')
+        return _make_client(service, aws_credentials.get('region') or 'us-east-1')
     if aws_credentials.get('access_key') and aws_credentials.get('secret_key'):
-        return boto3.client('cloudwatch', aws_access_key_id=aws_credentials['access_key'], aws_secret_access_key=aws_credentials['secret_key'], region_name=aws_credentials.get('region') or 'us-east-1')
-    return boto3.client('cloudwatch')
+        return _make_client(service, aws_credentials.get('region') or 'us-east-1', aws_credentials['access_key'], aws_credentials['secret_key'])
+    return _make_client(service, None)
+
+
+def get_cloudwatch_client():
+    return _get_client('cloudwatch')
 
 
 def get_ec2_client():
     """Get EC2 client with appropriate credentials"""
-    if aws_credentials.get('use_env'):
-        return boto3.client('ec2', region_name=aws_credentials.get('region') or 'us-east-1')
-    if aws_credentials.get('access_key') and aws_credentials.get('secret_key'):
-        return boto3.client('ec2', aws_access_key_id=aws_credentials['access_key'], aws_secret_access_key=aws_credentials['secret_key'], region_name=aws_credentials.get('region') or 'us-east-1')
-    return boto3.client('ec2')
+    return _get_client('ec2')
+
+
+def latest_metric_values(specs):
+    """Return the latest 5-minute Average for each (namespace, metric, dimensions) spec.
+
+    Cache misses are fetched together in one GetMetricData request; missing or
+    failed metrics come back as None.
+    """
+    keys = [(aws_credentials.get('account_id'), aws_credentials.get('region'), ns, name,
+             tuple(sorted((d['Name'], d['Value']) for d in (dims or []))))
+            for ns, name, dims in specs]
+    values = {}
+    with _cw_lock:
+        for key in keys:
+            if key in _cw_cache:
+                values[key] = _cw_cache[key]
+    missing = [(i, key) for i, key in enumerate(keys) if key not in values]
+    if missing:
+        queries = []
+        for i, _ in missing:
+            ns, name, dims = specs[i]
+            metric = {'Namespace': ns, 'MetricName': name}
+            if dims:
+                metric['Dimensions'] = dims
+            queries.append({
+                'Id': f'm{i}',
+                'MetricStat': {'Metric': metric, 'Period': 300, 'Stat': 'Average'},
+                'ReturnData': True,
+            })
+        latest = {}
+        try:
+            now = datetime.utcnow()
+            params = dict(MetricDataQueries=queries, StartTime=now - timedelta(minutes=10), EndTime=now,
+                          ScanBy='TimestampDescending')
+            while True:
+                resp = get_cloudwatch_client().get_metric_data(**params)
+                for result in resp.get('MetricDataResults', []):
+                    # Results are newest-first, so the first value seen per Id is the latest.
+                    if result.get('Values') and result['Id'] not in latest:
+                        latest[result['Id']] = result['Values'][0]
+                if not resp.get('NextToken'):
+                    break
+                params['NextToken'] = resp['NextToken']
+        except botocore.exceptions.ClientError as e:
+            app.logger.warning('CloudWatch error: %s', e)
+            return [values.get(key) for key in keys]
+        with _cw_lock:
+            for i, key in missing:
+                values[key] = _cw_cache[key] = latest.get(f'm{i}')
+    return [values[key] for key in keys]
+
+
+def _singleflight(key, fn):
+    """Run `fn()` once per `key` while a call is in flight; concurrent callers wait on its result.
+
+    A caller that waits more than 10s for the in-flight call runs `fn()` itself.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        try:
+            return future.result(timeout=10)
+        except FutureTimeoutError:
+            app.logger.warning('Timed out waiting on in-flight fetch %s; fetching directly', key)
+            return fn()
+    try:
+        result = fn()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _instance_summary(i, include_tags=False):
+    """Flatten a describe_instances record into the fields the dashboard shows."""
+    tags = i.get('Tags') or []
+    summary = {
+        'InstanceId': i.get('InstanceId'),
+        'Name': {t.get('Key'): t.get('Value', '') for t in tags}.get('Name', ''),
+        'State': i.get('State', {}).get('Name'),
+        'InstanceType': i.get('InstanceType'),
+        'PrivateIpAddress': i.get('PrivateIpAddress'),
+        'PublicIpAddress': i.get('PublicIpAddress'),
+        'LaunchTime': i.get('LaunchTime'),
+    }
+    if include_tags:
+        summary['Tags'] = tags
+    return summary
 
 
 @app.route('/api/instances')
 def instances():
-    """Return a list of running EC2 instances visible to the current credentials."""
+    """Return a list of running EC2 instances visible to the current credentials.
+
+    With `?format=ndjson` (or `Accept: application/x-ndjson`) instances are streamed
+    one JSON object per line as pages arrive, instead of buffered into one response;
+    if a later page fails, the stream ends with an `{"ok": false, "error": ...}` line.
+    The full `Tags` list is only included with `?include=tags`.
+    """
     if not aws_creds_present():
         return jsonify({'ok': False, 'message': 'AWS credentials not found. Please login first.'}), 401
     try:
         ec2 = get_ec2_client()
-        resp = ec2.describe_instances(Filters=[{'Name': 'instance-state-name', 'Values': ['running']}])
-        out = []
-        for r in resp.get('Reservations', []):
-            for i in r.get('Instances', []):
-                # Extract Name tag if present
-                name_tag = ''
-                for tag in i.get('Tags', []):
-                    if tag.get('Key') == 'Name':
-                        name_tag = tag.get('Value', '')
-                        break
-                
-                out.append({
-                    'InstanceId': i.get('InstanceId'),
-                    'Name': name_tag,
-                    'State': i.get('State', {}).get('Name'),
-                    'InstanceType': i.get('InstanceType'),
-                    'PrivateIpAddress': i.get('PrivateIpAddress'),
-                    'PublicIpAddress': i.get('PublicIpAddress'),
-                    'LaunchTime': i.get('LaunchTime').isoformat() if i.get('LaunchTime') else None,
-                    'Tags': i.get('Tags', [])
-                })
+        # describe_instances is paginated; PageSize maps to MaxResults (1000 is the EC2 cap).
+        paginator = ec2.get_paginator('describe_instances')
+        pages = iter(paginator.paginate(Filters=[{'Name': 'instance-state-name', 'Values': ['running']}],
+                                        PaginationConfig={'PageSize': 1000}))
+        # Fetch the first page eagerly so credential/API errors still produce a JSON 500
+        first_page = next(pages, None)
+        if first_page is not None:
+            pages = itertools.chain([first_page], pages)
+        include_tags = 'tags' in request.args.get('include', '').split(',')
+        summaries = (_instance_summary(i, include_tags)
+                     for page in pages
+                     for r in page.get('Reservations', [])
+                     for i in r.get('Instances', []))
+        if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+            def rows():
+                try:
+                    for row in summaries:
+                        yield orjson.dumps(row, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+                except Exception as e:
+                    # Headers are already sent; end the stream with an error line instead
+                    app.logger.exception('Failed to list instances')
+                    yield orjson.dumps({'ok': False, 'error': str(e)}, option=orjson.OPT_APPEND_NEWLINE)
+            return Response(stream_with_context(rows()), mimetype='application/x-ndjson')
+        out = list(summaries)
         return jsonify({'ok': True, 'instances': out})
     except Exception as e:
         app.logger.exception('Failed to list instances')
         return jsonify({'ok': False, 'error': str(e)}), 500
 
 
-@app.route('/api/config')
-def config():
+def _rebuild_config():
+    """Rebuild the cached /api/config payload; call after credentials change."""
     cfg = FRONTEND_CONFIG.copy()
     cfg['awsAccountId'] = aws_credentials.get('account_id') or os.environ.get('AWS_ACCOUNT_ID', '')
     cfg['region'] = aws_credentials.get('region') or os.environ.get('AWS_REGION', os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
@@ -169,7 +404,16 @@ def config():
     cfg['grafanaUrl'] = os.environ.get('GRAFANA_URL', '')
     cfg['nagiosInstanceId'] = os.environ.get('NAGIOS_INSTANCE_ID', '')
     cfg['grafanaInstanceId'] = os.environ.get('GRAFANA_INSTANCE_ID', '')
-    return jsonify(cfg)
+    _CONFIG_CACHE['payload'] = cfg
+    _CONFIG_CACHE['version'] += 1
+
+
+_rebuild_config()
+
+
+@app.route('/api/config')
+def config():
+    return jsonify(_CONFIG_CACHE['payload'])
 
 
 @app.route('/api/metrics')
@@ -187,48 +431,37 @@ def metrics():
                 'lambda_duration': 0,
                 'lambda_errors': 0,
                 'sns_messages': 0,
-                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'timestamp': datetime.utcnow(),
                 'activities': [
                     {'type': 'info', 'message': 'No AWS credentials configured - showing placeholder data', 'time': 'Now'}
                 ]
             }
         })
 
-    cw = get_cloudwatch_client()
-
-    def recent_stat(namespace, metric_name, dimension_filters=None):
-        try:
-            now = datetime.utcnow()
-            start = now - timedelta(minutes=10)
-            params = dict(Namespace=namespace, MetricName=metric_name, StartTime=start, EndTime=now, Period=300, Statistics=['Average'])
-            if dimension_filters:
-                params['Dimensions'] = dimension_filters
-            resp = cw.get_metric_statistics(**params)
-            datapoints = resp.get('Datapoints', [])
-            if not datapoints:
-                return None
-            latest = max(datapoints, key=lambda d: d['Timestamp'])
-            return latest.get('Average')
-        except botocore.exceptions.ClientError as e:
-            app.logger.warning('CloudWatch error: %s', e)
-            return None
-
-    cpu = recent_stat('AWS/EC2', 'CPUUtilization') or 0.0
-    mem = recent_stat('System/Linux', 'MemoryUtilization') or 0.0
-    disk = recent_stat('System/Linux', 'DiskSpaceUtilization') or 0.0
+    specs = [
+        ('AWS/EC2', 'CPUUtilization', None),
+        ('System/Linux', 'MemoryUtilization', None),
+        ('System/Linux', 'DiskSpaceUtilization', None),
+        ('AWS/Lambda', 'Invocations', None),
+        ('AWS/Lambda', 'Duration', None),
+        ('AWS/Lambda', 'Errors', None),
+    ]
+    key = f"{aws_credentials.get('account_id')}:{aws_credentials.get('region')}:{int(time.time() // 30)}"
+    values = _singleflight(key, lambda: latest_metric_values(specs))
+    cpu, mem, disk, invocations, duration, errors = [v or 0 for v in values]
 
     payload = {
         'ok': True,
         'mock': False,
         'data': {
-            'cpu': round(cpu, 2),
-            'memory': round(mem, 2),
-            'disk': round(disk, 2),
-            'lambda_invocations': int(recent_stat('AWS/Lambda', 'Invocations') or 0),
-            'lambda_duration': int(recent_stat('AWS/Lambda', 'Duration') or 0),
-            'lambda_errors': int(recent_stat('AWS/Lambda', 'Errors') or 0),
+            'cpu': round(float(cpu), 2),
+            'memory': round(float(mem), 2),
+            'disk': round(float(disk), 2),
+            'lambda_invocations': int(invocations),
+            'lambda_duration': int(duration),
+            'lambda_errors': int(errors),
             'sns_messages': 0,
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': datetime.utcnow(),
             'activities': []
         }
     }
@@ -247,11 +480,12 @@ def nagios():
     pwd = os.environ.get('NAGIOS_PASS')
     full = nagios_url.rstrip('/') + '/' + path.lstrip('/')
     try:
-        if user and pwd:
-            r = requests.get(full, auth=(user, pwd), timeout=10)
-        else:
-            r = requests.get(full, timeout=10)
-        return (r.content, r.status_code, {'Content-Type': r.headers.get('Content-Type', 'application/json')})
+        r = _nagios_session.get(full, auth=(user, pwd) if user and pwd else None, timeout=10, stream=True)
+        resp = Response(r.iter_content(8192), status=r.status_code,
+                        headers={'Content-Type': r.headers.get('Content-Type', 'application/json')})
+        # Return the upstream connection to the pool once the body is relayed.
+        resp.call_on_close(r.close)
+        return resp
     except requests.RequestException as e:
         app.logger.warning('Nagios proxy error: %s', e)
         return jsonify({'ok': False, 'message': 'failed to fetch from Nagios', 'detail': str(e)}), 502
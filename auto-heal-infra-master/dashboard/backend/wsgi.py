@@ -0,0 +1,7 @@
+"""WSGI entry point for the dashboard backend.
+
+Run with gunicorn, e.g.:
+
+    gunicorn -w 1 --threads 8 -b 0.0.0.0:5001 wsgi:app
+"""
+from app import app
@@ -4,7 +4,8 @@ import logging
 import os
 import re
 import time
-from typing import Dict, Any, Optional
+from botocore.exceptions import WaiterError
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
 # Configure logging
@@ -12,11 +13,18 @@ logger = logging.getLogger()
 log_level = os.environ.get('LOG_LEVEL', 'INFO')
 logger.setLevel(getattr(logging, log_level, logging.INFO))
 
-# Initialize AWS clients
-ec2_client = boto3.client('ec2')
-ssm_client = boto3.client('ssm')
-sns_client = boto3.client('sns')
-cloudwatch_client = boto3.client('cloudwatch')
+# Lambda supplies credentials through environment variables, so keep the
+# credential chain from falling through to the instance metadata service.
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    os.environ.setdefault('AWS_EC2_METADATA_DISABLED', 'true')
+    os.environ.setdefault('AWS_METADATA_SERVICE_TIMEOUT', '1')
+
+# Initialize AWS clients from one session so they share resolved credentials
+session = boto3.session.Session()
+ec2_client = session.client('ec2')
+ssm_client = session.client('ssm')
+sns_client = session.client('sns')
+cloudwatch_client = session.client('cloudwatch')
 
 # Environment variables
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN', '')
@@ -25,6 +33,13 @@ HEALING_ACTION_TIMEOUT = int(os.environ.get('HEALING_ACTION_TIMEOUT', 300))
 MAX_HEALING_ATTEMPTS = int(os.environ.get('MAX_HEALING_ATTEMPTS', 3))
 ENABLE_MULTI_REGION = os.environ.get('ENABLE_MULTI_REGION', 'false').lower() == 'true'
 
+# Instance IDs in plain-text alerts
+_INSTANCE_ID_RE = re.compile(r'i-[a-z0-9]+')
+
+# Instance details cached across warm invocations: instance_id -> (fetched_at, instance)
+INSTANCE_CACHE_TTL = 60
+_INSTANCE_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -39,7 +54,7 @@ def log_healing_action(instance_id: str, action: str, status: str, details: str
         'status': status,
         'details': details
     }
-    logger.info(f"HEALING_ACTION: {json.dumps(log_entry)}")
+    logger.info("HEALING_ACTION: %s", json.dumps(log_entry))
     return log_entry
 
 
@@ -70,58 +85,62 @@ def parse_sns_message(event: Dict[str, Any]) -> Dict[str, Any]:
             try:
                 message = json.loads(message_str)
             except json.JSONDecodeError:
-                logger.warning(f"Could not parse as JSON, treating as plain text: {message_str}")
+                logger.warning("Could not parse as JSON, treating as plain text: %s", message_str)
                 message = {'raw_message': message_str}
         else:
             message = message_str
             
-        logger.info(f"Parsed SNS Message: {json.dumps(message, default=str)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Parsed SNS Message: %s", json.dumps(message, default=str))
         return message
         
     except Exception as e:
-        logger.error(f"Error parsing SNS message: {str(e)}", exc_info=True)
+        logger.error("Error parsing SNS message: %s", e, exc_info=True)
         return {}
 
 
 def extract_instance_id(message: Dict[str, Any]) -> Optional[str]:
     """Extract instance ID from CloudWatch alarm message"""
-    # Try different paths where instance ID might be
-    paths = [
-        ['Trigger', 'Dimensions', 'InstanceId'],
-        ['instance_id'],
-        ['InstanceId'],
-    ]
+    if not isinstance(message, dict):
+        logger.warning("Could not extract instance ID from non-object message")
+        return None
     
-    for path in paths:
-        try:
-            value = message
-            for key in path:
-                value = value[key]
-            if value and isinstance(value, str) and value.startswith('i-'):
-                logger.info(f"Extracted instance ID from path {path}: {value}")
-                return value
-        except (KeyError, TypeError, IndexError):
-            continue
+    # Try different fields where instance ID might be, in priority order
+    trigger = message.get('Trigger')
+    dimensions = trigger.get('Dimensions') if isinstance(trigger, dict) else None
+    candidates = (
+        dimensions.get('InstanceId') if isinstance(dimensions, dict) else None,
+        message.get('instance_id'),
+        message.get('InstanceId'),
+    )
+    for value in candidates:
+        if isinstance(value, str) and value.startswith('i-'):
+            logger.info("Extracted instance ID from message: %s", value)
+            return value
     
     # Try regex extraction from raw message
     if 'raw_message' in message:
-        match = re.search(r'(i-[a-z0-9]+)', str(message['raw_message']))
+        match = _INSTANCE_ID_RE.search(str(message['raw_message']))
         if match:
-            return match.group(1)
+            return match.group(0)
     
     logger.warning("Could not extract instance ID from message")
     return None
 
 
 def get_instance_details(instance_id: str) -> Optional[Dict[str, Any]]:
-    """Get EC2 instance details"""
+    """Get EC2 instance details, reusing a recent lookup from a warm container"""
+    cached = _INSTANCE_CACHE.get(instance_id)
+    if cached and time.monotonic() - cached[0] < INSTANCE_CACHE_TTL:
+        return cached[1]
     try:
         response = ec2_client.describe_instances(InstanceIds=[instance_id])
         instances = response['Reservations'][0]['Instances']
         if instances:
+            _INSTANCE_CACHE[instance_id] = (time.monotonic(), instances[0])
             return instances[0]
     except Exception as e:
-        logger.error(f"Error getting instance details for {instance_id}: {str(e)}")
+        logger.error("Error getting instance details for %s: %s", instance_id, e)
     return None
 
 
@@ -143,11 +162,11 @@ def get_instance_metrics(instance_id: str) -> Dict[str, float]:
         if cpu_response['Datapoints']:
             metrics['cpu_utilization'] = cpu_response['Datapoints'][-1]['Average']
         
-        logger.info(f"Instance {instance_id} metrics: {metrics}")
+        logger.info("Instance %s metrics: %s", instance_id, metrics)
         return metrics
         
     except Exception as e:
-        logger.error(f"Error getting metrics for {instance_id}: {str(e)}")
+        logger.error("Error getting metrics for %s: %s", instance_id, e)
         return {}
 
 
@@ -184,35 +203,37 @@ def execute_reboot_instance(instance_id: str) -> bool:
     """Reboot EC2 instance"""
     try:
         if not AUTO_HEALING_ENABLED:
-            logger.info(f"Auto-healing disabled, skipping reboot for {instance_id}")
+            logger.info("Auto-healing disabled, skipping reboot for %s", instance_id)
             return False
             
-        logger.info(f"Rebooting instance {instance_id}")
+        logger.info("Rebooting instance %s", instance_id)
         ec2_client.reboot_instances(InstanceIds=[instance_id])
+        _INSTANCE_CACHE.pop(instance_id, None)
         log_healing_action(instance_id, 'reboot', 'initiated', 'EC2 instance reboot initiated')
         return True
         
     except Exception as e:
-        logger.error(f"Error rebooting instance {instance_id}: {str(e)}")
+        logger.error("Error rebooting instance %s: %s", instance_id, e)
         log_healing_action(instance_id, 'reboot', 'failed', str(e))
         return False
 
 
-def execute_ssm_command(instance_id: str, action: str) -> bool:
+def execute_ssm_command(instance_id: str, action: str, instance: Optional[Dict[str, Any]] = None) -> bool:
     """Execute healing script on instance via Systems Manager"""
     try:
         if not AUTO_HEALING_ENABLED:
-            logger.info(f"Auto-healing disabled, skipping SSM command for {instance_id}")
+            logger.info("Auto-healing disabled, skipping SSM command for %s", instance_id)
             return False
         
         # Verify instance is running and has SSM access
-        instance = get_instance_details(instance_id)
+        if instance is None:
+            instance = get_instance_details(instance_id)
         if not instance:
-            logger.error(f"Instance {instance_id} not found")
+            logger.error("Instance %s not found", instance_id)
             return False
         
         if instance['State']['Name'] != 'running':
-            logger.warning(f"Instance {instance_id} is not running, cannot execute SSM command")
+            logger.warning("Instance %s is not running, cannot execute SSM command", instance_id)
             return False
         
         # Build command based on action
@@ -251,7 +272,7 @@ def execute_ssm_command(instance_id: str, action: str) -> bool:
         
         command = commands.get(action, commands['diagnostic'])
         
-        logger.info(f"Executing SSM command: {action} on instance {instance_id}")
+        logger.info("Executing SSM command: %s on instance %s", action, instance_id)
         
         response = ssm_client.send_command(
             InstanceIds=[instance_id],
@@ -261,35 +282,40 @@ def execute_ssm_command(instance_id: str, action: str) -> bool:
         )
         
         command_id = response['Command']['CommandId']
-        logger.info(f"SSM command {command_id} sent to instance {instance_id}")
+        logger.info("SSM command %s sent to instance %s", command_id, instance_id)
         log_healing_action(instance_id, f'ssm_{action}', 'initiated', f'Command ID: {command_id}')
         
-        # Check command status
-        max_attempts = 10
-        for attempt in range(max_attempts):
-            time.sleep(3)
-            status_response = ssm_client.get_command_invocation(
+        # Wait for the command to finish; the waiter polls every 2s for up to 30s
+        # and stops early on success or a terminal failure status.
+        try:
+            ssm_client.get_waiter('command_executed').wait(
                 CommandId=command_id,
-                InstanceId=instance_id
+                InstanceId=instance_id,
+                WaiterConfig={'Delay': 2, 'MaxAttempts': 15}
             )
-            
-            status = status_response['Status']
-            logger.info(f"Command {command_id} status: {status}")
-            
-            if status in ['Success', 'Failed']:
-                if status == 'Success':
-                    log_healing_action(instance_id, f'ssm_{action}', 'completed', 'SSM command completed successfully')
-                    return True
-                else:
-                    error_msg = status_response.get('StandardErrorContent', 'Unknown error')
-                    log_healing_action(instance_id, f'ssm_{action}', 'failed', error_msg)
-                    return False
-        
-        logger.warning(f"Command {command_id} did not complete within timeout period")
+        except WaiterError as e:
+            logger.info("Waiter for command %s stopped: %s", command_id, e)
+        
+        status_response = ssm_client.get_command_invocation(
+            CommandId=command_id,
+            InstanceId=instance_id
+        )
+        status = status_response['Status']
+        logger.info("Command %s status: %s", command_id, status)
+        
+        if status == 'Success':
+            log_healing_action(instance_id, f'ssm_{action}', 'completed', 'SSM command completed successfully')
+            return True
+        if status in ['Failed', 'Cancelled', 'TimedOut']:
+            error_msg = status_response.get('StandardErrorContent', 'Unknown error')
+            log_healing_action(instance_id, f'ssm_{action}', 'failed', error_msg)
+            return False
+        
+        logger.warning("Command %s did not complete within timeout period", command_id)
         return False
         
     except Exception as e:
-        logger.error(f"Error executing SSM command on {instance_id}: {str(e)}")
+        logger.error("Error executing SSM command on %s: %s", instance_id, e)
         log_healing_action(instance_id, f'ssm_{action}', 'failed', str(e))
         return False
 
@@ -315,10 +341,10 @@ def publish_healing_result(instance_id: str, action: str, success: bool, details
             Message=json.dumps(message, indent=2, default=str)
         )
         
-        logger.info(f"Published healing result to SNS: {message}")
+        logger.info("Published healing result to SNS: %s", message)
         
     except Exception as e:
-        logger.error(f"Error publishing to SNS: {str(e)}")
+        logger.error("Error publishing to SNS: %s", e)
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -329,7 +355,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Parses alert, determines healing action, and executes remediation.
     """
     
-    logger.info(f"Lambda invoked with event: {json.dumps(event, default=str)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Lambda invoked with event: %s", json.dumps(event, default=str))
     
     try:
         # Parse SNS message
@@ -345,29 +372,29 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'body': json.dumps({'error': 'Could not extract instance ID from alert'})
             }
         
-        logger.info(f"Processing alert for instance: {instance_id}")
+        logger.info("Processing alert for instance: %s", instance_id)
         
         # Get instance details
         instance = get_instance_details(instance_id)
         if not instance:
-            logger.error(f"Instance {instance_id} not found or inaccessible")
+            logger.error("Instance %s not found or inaccessible", instance_id)
             return {
                 'statusCode': 404,
                 'body': json.dumps({'error': f'Instance {instance_id} not found'})
             }
         
-        logger.info(f"Instance state: {instance['State']['Name']}")
+        logger.info("Instance state: %s", instance['State']['Name'])
         
         # Determine healing action
         action = determine_healing_action(message, instance_id)
-        logger.info(f"Determined healing action: {action}")
+        logger.info("Determined healing action: %s", action)
         
         # Execute healing action
         success = False
         if action == 'reboot':
             success = execute_reboot_instance(instance_id)
         else:
-            success = execute_ssm_command(instance_id, action)
+            success = execute_ssm_command(instance_id, action, instance)
         
         # Publish result
         publish_healing_result(instance_id, action, success, message.get('AlarmDescription', ''))
@@ -383,7 +410,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Unhandled exception in Lambda handler: {str(e)}", exc_info=True)
+        logger.error("Unhandled exception in Lambda handler: %s", e, exc_info=True)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': f'Lambda execution failed: {str(e)}'})
@@ -95,7 +95,7 @@ After=network.target
 User=ec2-user
 WorkingDirectory=/opt/auto-heal-dashboard/backend
 Environment=FLASK_ENV=production
-ExecStart=/opt/auto-heal-dashboard/backend/.venv/bin/gunicorn -w 3 -b 127.0.0.1:5000 app:app
+ExecStart=/opt/auto-heal-dashboard/backend/.venv/bin/gunicorn -w 1 --threads 8 -b 127.0.0.1:5000 wsgi:app
 Restart=always
 
 [Install]